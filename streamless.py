@@ -5,20 +5,31 @@ and displays it in the browser, with ES/NQ candlestick charts.
 """
 
 import os
+import hashlib
+import re
+import threading
 import streamlit as st
 import streamlit.components.v1 as components
 from pathlib import Path
-import urllib.request
-import urllib.error
+import requests
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime, timedelta
 
 # ---------------------------------------------------------------------------
 # HTML loading helpers
 # ---------------------------------------------------------------------------
 
+@st.cache_data(max_entries=8, ttl=300, show_spinner=False)
+def _load_html_cached(path_str: str, mtime_ns: int) -> str:
+    """Read an HTML file once per (path, mtime); mtime_ns only keys the cache."""
+    with open(path_str, "rb") as f:
+        return f.read().decode("utf-8", "replace")
+
+
 def read_local_html(filename: str = "index.html") -> str | None:
     """Read HTML file from the same directory as this script."""
     try:
@@ -26,14 +37,18 @@ def read_local_html(filename: str = "index.html") -> str | None:
         html_path = current_dir / filename
         
         if html_path.exists():
-            with open(html_path, "r", encoding="utf-8") as f:
-                return f.read()
+            return _load_html_cached(str(html_path), html_path.stat().st_mtime_ns)
         return None
     except Exception as e:
         st.error(f"讀取本地檔案時發生錯誤：{e}")
         return None
 
 
+def _is_html_entry(entry: os.DirEntry) -> bool:
+    """Match what Path.glob("*.html") would: regular files ending in .html."""
+    return entry.name.endswith(".html") and entry.is_file()
+
+
 def get_latest_html_in_data() -> str | None:
     """Get the latest HTML file from the data subdirectory."""
     try:
@@ -44,37 +59,45 @@ def get_latest_html_in_data() -> str | None:
             st.error(f"❌ data 目錄不存在")
             return None
         
-        # Find all HTML files
-        html_files = list(data_dir.glob("*.html"))
+        # Find the latest modified HTML file in one directory scan
+        with os.scandir(data_dir) as it:
+            latest_entry = max(
+                (e for e in it if _is_html_entry(e)),
+                key=lambda e: e.stat().st_mtime,
+                default=None,
+            )
         
-        if not html_files:
+        if latest_entry is None:
             st.error("❌ data 目錄中找不到 HTML 檔案")
             return None
         
-        # Get the latest modified file
-        latest_file = max(html_files, key=lambda p: p.stat().st_mtime)
-        
-        with open(latest_file, "r", encoding="utf-8") as f:
-            return f.read()
+        return _load_html_cached(latest_entry.path, latest_entry.stat().st_mtime_ns)
     except Exception as e:
         st.error(f"讀取 data 目錄中的 HTML 檔案時發生錯誤：{e}")
         return None
 
 
+@st.cache_data(ttl=5, show_spinner=False)
+def _list_html_files() -> list[Path]:
+    """Scan data/ for HTML files, newest first; raises so errors aren't cached."""
+    current_dir = Path(__file__).parent
+    data_dir = current_dir / "data"
+    
+    if not data_dir.exists():
+        return []
+    
+    # Find all HTML files and sort by modification time (newest first)
+    with os.scandir(data_dir) as it:
+        entries = [e for e in it if _is_html_entry(e)]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    
+    return [Path(e.path) for e in entries]
+
+
 def get_html_files_list() -> list[Path]:
     """Get list of all HTML files in data subdirectory."""
     try:
-        current_dir = Path(__file__).parent
-        data_dir = current_dir / "data"
-        
-        if not data_dir.exists():
-            return []
-        
-        # Find all HTML files and sort by modification time (newest first)
-        html_files = list(data_dir.glob("*.html"))
-        html_files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-        
-        return html_files
+        return _list_html_files()
     except Exception as e:
         st.error(f"獲取 HTML 檔案列表時發生錯誤：{e}")
         return []
@@ -83,13 +106,15 @@ def get_html_files_list() -> list[Path]:
 def read_html_file(file_path: Path) -> str | None:
     """Read HTML content from a file path."""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return _load_html_cached(str(file_path), file_path.stat().st_mtime_ns)
     except Exception as e:
         st.error(f"讀取檔案時發生錯誤：{e}")
         return None
 
 
+_TABLE_TAG_RE = re.compile(r"<t(?:able|r)")
+
+
 def estimate_html_height(html_content: str) -> int:
     """Estimate HTML height based on content length."""
     # 計算行數來估算高度
@@ -101,8 +126,8 @@ def estimate_html_height(html_content: str) -> int:
     content_length = len(html_content)
     content_based = (content_length // 200) * 20
     
-    # 檢查是否有表格或複雜結構
-    table_count = html_content.count('<table') + html_content.count('<tr')
+    # 檢查是否有表格或複雜結構 (一次掃描同時計算 <table 與 <tr)
+    table_count = sum(1 for _ in _TABLE_TAG_RE.finditer(html_content))
     table_bonus = table_count * 30
     
     # 取最大值，設定最小值2000px，最大值100000px
@@ -114,31 +139,191 @@ def estimate_html_height(html_content: str) -> int:
 # Yahoo Finance helpers
 # ---------------------------------------------------------------------------
 
-def get_futures_data(symbol: str, period: str = "3mo", interval: str = "1d") -> pd.DataFrame | None:
-    """Fetch futures data from Yahoo Finance."""
+# (Yahoo 代號, 顯示名稱, 全名)
+FUTURES = (
+    ("ES=F", "ES", "E-mini S&P 500"),
+    ("NQ=F", "NQ", "E-mini Nasdaq-100"),
+)
+FUTURES_SYMBOLS = tuple(symbol for symbol, _, _ in FUTURES)
+
+
+@st.cache_resource
+def _yf_download_lock() -> threading.Lock:
+    """Process-wide lock around yf.download, which is not thread-safe."""
+    return threading.Lock()
+
+
+def _download_futures(symbols: tuple[str, ...], period: str, interval: str) -> dict[str, pd.DataFrame]:
+    """Download several futures in one yfinance call.
+    
+    Raises instead of returning empty results so that st.cache_data never
+    stores a failed fetch; a LookupError means Yahoo returned no bars.
+    """
+    # yf.download 會重設並讀取模組層級的 shared._DFS/_ERRORS，跨 session 必須序列化
+    with _yf_download_lock():
+        raw = yf.download(
+            list(symbols),
+            period=period,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+        )
+    if raw is None or raw.empty:
+        raise LookupError(f"Yahoo Finance 未回傳 {', '.join(symbols)} 數據")
+    
+    # 單一代號時舊版 yfinance 不會產生 MultiIndex 欄位
+    if not isinstance(raw.columns, pd.MultiIndex):
+        raw = pd.concat({symbols[0]: raw}, axis=1)
+    
+    frames = {}
+    missing = []
+    available = set(raw.columns.get_level_values(0))
+    for symbol in symbols:
+        df = raw[symbol].dropna(how="all") if symbol in available else None
+        if df is None or df.empty:
+            missing.append(symbol)
+        else:
+            frames[symbol] = df
+    if missing:
+        raise LookupError(f"Yahoo Finance 未回傳 {', '.join(missing)} 數據")
+    return frames
+
+
+def _load_futures_data(fetch, symbols: tuple[str, ...]) -> tuple[dict[str, pd.DataFrame], dict[str, Exception]]:
+    """Call a cached futures fetch, retrying per symbol if the batch fails.
+    
+    Returns the frames that loaded and the error for each symbol that didn't.
+    """
     try:
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=interval)
-        if df.empty:
-            st.warning(f"⚠️ 無法獲取 {symbol} 數據")
-            return None
-        return df
-    except Exception as e:
-        st.error(f"獲取 {symbol} 數據時發生錯誤：{e}")
-        return None
+        return fetch(symbols), {}
+    except Exception:
+        frames, errors = {}, {}
+        for symbol in symbols:
+            try:
+                frames.update(fetch((symbol,)))
+            except Exception as e:
+                errors[symbol] = e
+        return frames, errors
+
+
+def _report_futures_error(symbol: str, error: Exception, label: str = "") -> None:
+    """Show a fetch failure the way the baseline did: warning for no data, error otherwise."""
+    if isinstance(error, LookupError):
+        st.warning(f"⚠️ 無法獲取 {symbol} {label}數據")
+    else:
+        st.error(f"獲取 {symbol} {label}數據時發生錯誤：{error}")
+
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_daily_futures_data(symbols: tuple[str, ...], period: str = "3mo") -> dict[str, pd.DataFrame]:
+    """Fetch daily futures bars (cached for an hour)."""
+    return _download_futures(symbols, period, "1d")
 
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_intraday_futures_data(symbols: tuple[str, ...], period: str = "5d") -> dict[str, pd.DataFrame]:
+    """Fetch one-minute futures bars (cached for 30 seconds)."""
+    return _download_futures(symbols, period, "1m")
+
+
+BAND_COLUMNS = ('SMA', 'STD', 'Upper', 'Lower')
+
+
+def _bb_kernel(close: np.ndarray, window: int, k: float) -> np.ndarray:
+    """Rolling mean / sample std over `window` plus the k-sigma bands.
+    
+    Uses windowed differences of cumulative sums, so Close is scanned once
+    instead of once per rolling call. Returns one (n, 4) float64 block in
+    BAND_COLUMNS order. Windows containing NaN yield NaN, matching pandas'
+    default min_periods.
+    """
+    n = close.shape[0]
+    out = np.full((n, len(BAND_COLUMNS)), np.nan)
+    if window >= 1 and n >= window:
+        valid = np.isfinite(close)
+        # 先減去平均值以降低平方和相減時的精度損失
+        shift = close[valid].mean() if valid.any() else 0.0
+        x = np.where(valid, close - shift, 0.0)
+        
+        csum = np.concatenate(([0.0], np.cumsum(x)))
+        csum_sq = np.concatenate(([0.0], np.cumsum(x * x)))
+        ccount = np.concatenate(([0], np.cumsum(valid)))
+        
+        s1 = csum[window:] - csum[:-window]
+        s2 = csum_sq[window:] - csum_sq[:-window]
+        full = (ccount[window:] - ccount[:-window]) == window
+        
+        mean = s1 / window
+        sma = out[window - 1:, 0]
+        std = out[window - 1:, 1]
+        sma[:] = np.where(full, mean + shift, np.nan)
+        # 樣本標準差 (ddof=1) 在 window == 1 時未定義，維持 NaN
+        if window > 1:
+            var = np.maximum((s2 - s1 * mean) / (window - 1), 0.0)
+            std[:] = np.where(full, np.sqrt(var), np.nan)
+        out[window - 1:, 2] = sma + k * std
+        out[window - 1:, 3] = sma - k * std
+    
+    return out
+
+
+def last_session(df: pd.DataFrame) -> pd.DataFrame:
+    """Slice the bars on the calendar day of the last bar (index must be sorted)."""
+    return df.loc[df.index[-1].normalize():]
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
 def calculate_bollinger_bands(df: pd.DataFrame, window: int = 20, num_std: float = 2.0) -> pd.DataFrame:
     """Calculate Bollinger Bands."""
-    df = df.copy()
-    df['SMA'] = df['Close'].rolling(window=window).mean()
-    df['STD'] = df['Close'].rolling(window=window).std()
-    df['Upper'] = df['SMA'] + (df['STD'] * num_std)
-    df['Lower'] = df['SMA'] - (df['STD'] * num_std)
-    return df
+    bands = _bb_kernel(df['Close'].to_numpy(dtype=np.float64), window, num_std)
+    # 四個欄位以單一 float64 區塊一次加入，不逐欄插入
+    bands_df = pd.DataFrame(bands, index=df.index, columns=list(BAND_COLUMNS))
+    return pd.concat([df.drop(columns=list(BAND_COLUMNS), errors='ignore'), bands_df], axis=1)
+
+
+@st.cache_resource
+def _chart_template() -> str:
+    """Register the layout shared by all candlestick charts; returns the template name."""
+    # 以 cache_resource 確保整個程序只建立一次，不會每次重跑都重建
+    pio.templates["app"] = go.layout.Template(layout=go.Layout(
+        height=500,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+    ))
+    return "plotly_white+app"
+
+_BAND_LINE = dict(color='rgba(173, 216, 230, 0.5)', width=1)
+_SMA_LINE = dict(color='orange', width=1.5)
+
+
+def _chart_data_key(df: pd.DataFrame) -> str:
+    """Hash the index and plotted price columns of a chart DataFrame."""
+    columns = [c for c in ('Open', 'High', 'Low', 'Close', 'SMA', 'Upper', 'Lower') if c in df.columns]
+    digest = hashlib.blake2b(df.index.values.tobytes(), digest_size=16)
+    digest.update(df[columns].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _cached_candlestick_chart(_df: pd.DataFrame, data_key: str, title: str, show_bollinger: bool) -> go.Figure:
+    """Build the figure once per distinct data; `_df` is excluded from hashing."""
+    return _build_candlestick_chart(_df, title, show_bollinger)
 
 
 def create_candlestick_chart(df: pd.DataFrame, title: str, show_bollinger: bool = True) -> go.Figure:
+    """Create a candlestick chart with optional Bollinger Bands (cached across reruns)."""
+    return _cached_candlestick_chart(df, _chart_data_key(df), title, show_bollinger)
+
+
+def _build_candlestick_chart(df: pd.DataFrame, title: str, show_bollinger: bool = True) -> go.Figure:
     """Create a candlestick chart with optional Bollinger Bands."""
     fig = go.Figure()
     
@@ -156,66 +341,65 @@ def create_candlestick_chart(df: pd.DataFrame, title: str, show_bollinger: bool
     
     # Bollinger Bands (only if show_bollinger is True and columns exist)
     if show_bollinger and 'Upper' in df.columns:
+        # 上下軌合併為單一封閉多邊形：上軌由左至右、下軌由右至左
+        band = df[['Upper', 'Lower']].dropna()
         fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['Upper'],
-            name='上軌',
-            line=dict(color='rgba(250, 128, 114, 0.5)', width=1),
-            mode='lines'
+            x=band.index.append(band.index[::-1]),
+            y=np.concatenate([band['Upper'].to_numpy(), band['Lower'].to_numpy()[::-1]]),
+            name='布林通道',
+            line=_BAND_LINE,
+            mode='lines',
+            fill='toself',
+            fillcolor='rgba(173, 216, 230, 0.1)',
+            hoverinfo='skip'
         ))
         
         fig.add_trace(go.Scatter(
             x=df.index,
             y=df['SMA'],
             name='中軌 (SMA20)',
-            line=dict(color='orange', width=1.5),
+            line=_SMA_LINE,
             mode='lines'
         ))
-        
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['Lower'],
-            name='下軌',
-            line=dict(color='rgba(173, 216, 230, 0.5)', width=1),
-            mode='lines',
-            fill='tonexty',
-            fillcolor='rgba(173, 216, 230, 0.1)'
-        ))
     
     fig.update_layout(
         title=title,
+        template=_chart_template(),
         yaxis_title='價格',
         xaxis_title='日期',
-        height=500,
-        template='plotly_white',
         xaxis_rangeslider_visible=False,
-        hovermode='x unified',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
     )
     
     return fig
 
 
+@st.cache_resource
+def _get_session() -> requests.Session:
+    """Process-wide HTTP session so TCP/TLS connections are reused across reruns."""
+    # requests 預設即會要求 gzip 壓縮
+    return requests.Session()
+
+
+_GITHUB_BLOB_RE = re.compile(r"^https?://(?:www\.)?github\.com/([^/]+/[^/]+)/blob/(.*)$")
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _fetch_github_html(url: str) -> str:
+    """Download a GitHub file over the shared session; raises on failure so errors aren't cached."""
+    response = _get_session().get(url, timeout=10)
+    response.raise_for_status()
+    return response.content.decode("utf-8")
+
+
 def read_github_html(url: str) -> str | None:
     """Read HTML content from a GitHub raw URL."""
     try:
-        # Convert GitHub URL to raw URL if needed
-        if "github.com" in url and "raw.githubusercontent.com" not in url:
-            # Convert https://github.com/user/repo/blob/branch/path
-            # to https://raw.githubusercontent.com/user/repo/branch/path
-            url = url.replace("github.com", "raw.githubusercontent.com")
-            url = url.replace("/blob/", "/")
+        # Convert https://github.com/user/repo/blob/branch/path
+        # to https://raw.githubusercontent.com/user/repo/branch/path
+        url = _GITHUB_BLOB_RE.sub(r"https://raw.githubusercontent.com/\1/\2", url, count=1)
         
-        with urllib.request.urlopen(url, timeout=10) as response:
-            content = response.read().decode("utf-8")
-            return content
-    except urllib.error.URLError as e:
+        return _fetch_github_html(url)
+    except requests.RequestException as e:
         st.error(f"無法從 GitHub 讀取檔案：{e}")
         return None
     except Exception as e:
@@ -227,6 +411,116 @@ def read_github_html(url: str) -> str | None:
 # Streamlit UI
 # ---------------------------------------------------------------------------
 
+def build_charts_html() -> tuple[str, list[tuple[str, Exception, str]]]:
+    """Fetch ES/NQ data and render the chart section appended below each report.
+    
+    Returns the chart HTML and the (symbol, error, label) of each failed fetch
+    so the caller can report them on every rerun.
+    """
+    # 在HTML末尾追加K線圖
+    charts_html = """
+    <hr>
+    <h2 style='text-align:center; margin-top:40px;'>📈 ES & NQ 日K線圖 (含布林帶指標)</h2>
+    <div style='display: flex; gap: 20px; margin: 20px;'>
+    """
+    
+    # 一次請求同時下載 ES 與 NQ (yf.download 非執行緒安全，依序呼叫)
+    with st.spinner("正在獲取 ES / NQ 數據..."):
+        daily_data, daily_errors = _load_futures_data(get_daily_futures_data, FUTURES_SYMBOLS)
+        intraday_data, intraday_errors = _load_futures_data(get_intraday_futures_data, FUTURES_SYMBOLS)
+    
+    failures = []
+    
+    # plotly.js 只需隨第一張成功生成的圖載入一次
+    include_plotlyjs = 'cdn'
+    
+    # 生成各商品日K線圖
+    for symbol, name, full_name in FUTURES:
+        daily_df = daily_data.get(symbol)
+        if daily_df is None:
+            failures.append((symbol, daily_errors[symbol], ""))
+            continue
+        daily_df = calculate_bollinger_bands(daily_df)
+        latest = daily_df.iloc[-1]
+        charts_html += f"""
+        <div style='flex: 1;'>
+            <h3>{name} ({full_name})</h3>
+            <p><strong>最後一天 ({latest.name.strftime('%Y-%m-%d')})</strong></p>
+            <p>📈 布林上軌：<strong>{latest['Upper']:.2f}</strong> | 📉 布林下軌：<strong>{latest['Lower']:.2f}</strong></p>
+        """
+        fig = create_candlestick_chart(daily_df, f"{name} 日K線圖 + 布林通道")
+        charts_html += fig.to_html(include_plotlyjs=include_plotlyjs, div_id=f'{name.lower()}-daily-chart', full_html=False)
+        charts_html += "</div>"
+        include_plotlyjs = False
+    
+    charts_html += """
+    </div>
+    <hr>
+    <h2 style='text-align:center; margin-top:40px;'>📊 ES & NQ 一分鐘線圖</h2>
+    <div style='display: flex; gap: 20px; margin: 20px;'>
+    """
+    
+    # 生成各商品一分鐘線圖
+    for symbol, name, _ in FUTURES:
+        intraday_df = intraday_data.get(symbol)
+        if intraday_df is None:
+            failures.append((symbol, intraday_errors[symbol], "一分鐘"))
+            continue
+        latest_date = intraday_df.index[-1].date()
+        today_df = last_session(intraday_df)
+        if today_df.empty:
+            continue
+        charts_html += f"""
+        <div style='flex: 1;'>
+            <h3>{name} 一分鐘線圖</h3>
+            <p>數據日期：{latest_date}</p>
+        """
+        fig = create_candlestick_chart(today_df, f"{name} 一分鐘K線圖", show_bollinger=False)
+        charts_html += fig.to_html(include_plotlyjs=include_plotlyjs, div_id=f'{name.lower()}-1m-chart', full_html=False)
+        charts_html += "</div>"
+        include_plotlyjs = False
+    
+    charts_html += "</div>"
+    
+    return charts_html, failures
+
+
+@st.fragment
+def render_html_viewer(html_files: list[Path]) -> None:
+    """Report selector and viewer; changing the report reruns only this fragment."""
+    # Create selectbox for HTML file selection
+    st.subheader("📁 選擇 HTML 報告")
+    file_options = [f.name for f in html_files]
+    selected_file = st.selectbox(
+        "選擇要顯示的報告",
+        options=file_options,
+        index=0,
+        help="按修改時間排序，最新的在最前面"
+    )
+    
+    # Read selected file (decoded once per file version by _load_html_cached)
+    selected_path = next(f for f in html_files if f.name == selected_file)
+    html_content = read_html_file(selected_path)
+    
+    if html_content:
+        st.divider()
+        
+        # K線圖只在整頁重跑時生成 (main 會先清除)；切換報告時沿用，不再重新取得數據
+        if st.session_state.get("charts") is None:
+            st.session_state["charts"] = build_charts_html()
+        charts_html, failures = st.session_state["charts"]
+        for symbol, error, label in failures:
+            _report_futures_error(symbol, error, label)
+        
+        # 合併HTML內容
+        combined_html = html_content + charts_html
+        
+        # 使用足够大的固定高度显示完整HTML
+        components.html(combined_html, height=20000, scrolling=False)
+    else:
+        st.error("❌ 無法讀取 HTML 檔案")
+
+
 def main():
     st.set_page_config(
         page_title="HTML Viewer",
@@ -237,113 +531,10 @@ def main():
     # Get list of HTML files
     html_files = get_html_files_list()
     
-    html_content = None
-    
     if html_files:
-        # Create selectbox for HTML file selection
-        st.subheader("📁 選擇 HTML 報告")
-        file_options = [f.name for f in html_files]
-        selected_file = st.selectbox(
-            "選擇要顯示的報告",
-            options=file_options,
-            index=0,
-            help="按修改時間排序，最新的在最前面"
-        )
-        
-        # Read selected file
-        selected_path = next(f for f in html_files if f.name == selected_file)
-        html_content = read_html_file(selected_path)
-        
-        if html_content:
-            st.divider()
-            
-            # 在HTML末尾追加K線圖
-            charts_html = """
-            <hr>
-            <h2 style='text-align:center; margin-top:40px;'>📈 ES & NQ 日K線圖 (含布林帶指標)</h2>
-            <div style='display: flex; gap: 20px; margin: 20px;'>
-            """
-            
-            # 獲取並生成ES日K線圖
-            with st.spinner("正在獲取 ES 數據..."):
-                es_data = get_futures_data("ES=F", period="3mo")
-                if es_data is not None:
-                    es_data = calculate_bollinger_bands(es_data)
-                    latest = es_data.iloc[-1]
-                    charts_html += f"""
-                    <div style='flex: 1;'>
-                        <h3>ES (E-mini S&P 500)</h3>
-                        <p><strong>最後一天 ({latest.name.strftime('%Y-%m-%d')})</strong></p>
-                        <p>📈 布林上軌：<strong>{latest['Upper']:.2f}</strong> | 📉 布林下軌：<strong>{latest['Lower']:.2f}</strong></p>
-                    """
-                    fig_es = create_candlestick_chart(es_data, "ES 日K線圖 + 布林通道")
-                    charts_html += fig_es.to_html(include_plotlyjs='cdn', div_id='es-daily-chart', full_html=False)
-                    charts_html += "</div>"
-            
-            # 獲取並生成NQ日K線圖
-            with st.spinner("正在獲取 NQ 數據..."):
-                nq_data = get_futures_data("NQ=F", period="3mo")
-                if nq_data is not None:
-                    nq_data = calculate_bollinger_bands(nq_data)
-                    latest = nq_data.iloc[-1]
-                    charts_html += f"""
-                    <div style='flex: 1;'>
-                        <h3>NQ (E-mini Nasdaq-100)</h3>
-                        <p><strong>最後一天 ({latest.name.strftime('%Y-%m-%d')})</strong></p>
-                        <p>📈 布林上軌：<strong>{latest['Upper']:.2f}</strong> | 📉 布林下軌：<strong>{latest['Lower']:.2f}</strong></p>
-                    """
-                    fig_nq = create_candlestick_chart(nq_data, "NQ 日K線圖 + 布林通道")
-                    charts_html += fig_nq.to_html(include_plotlyjs=False, div_id='nq-daily-chart', full_html=False)
-                    charts_html += "</div>"
-            
-            charts_html += """
-            </div>
-            <hr>
-            <h2 style='text-align:center; margin-top:40px;'>📊 ES & NQ 一分鐘線圖</h2>
-            <div style='display: flex; gap: 20px; margin: 20px;'>
-            """
-            
-            # 獲取並生成ES 1分鐘線圖
-            with st.spinner("正在獲取 ES 一分鐘數據..."):
-                es_1m_data = get_futures_data("ES=F", period="5d", interval="1m")
-                if es_1m_data is not None and not es_1m_data.empty:
-                    latest_date = es_1m_data.index[-1].date()
-                    es_1m_today = es_1m_data[es_1m_data.index.date == latest_date]
-                    if not es_1m_today.empty:
-                        charts_html += f"""
-                        <div style='flex: 1;'>
-                            <h3>ES 一分鐘線圖</h3>
-                            <p>數據日期：{latest_date}</p>
-                        """
-                        fig_es_1m = create_candlestick_chart(es_1m_today, "ES 一分鐘K線圖", show_bollinger=False)
-                        charts_html += fig_es_1m.to_html(include_plotlyjs=False, div_id='es-1m-chart', full_html=False)
-                        charts_html += "</div>"
-            
-            # 獲取並生成NQ 1分鐘線圖
-            with st.spinner("正在獲取 NQ 一分鐘數據..."):
-                nq_1m_data = get_futures_data("NQ=F", period="5d", interval="1m")
-                if nq_1m_data is not None and not nq_1m_data.empty:
-                    latest_date = nq_1m_data.index[-1].date()
-                    nq_1m_today = nq_1m_data[nq_1m_data.index.date == latest_date]
-                    if not nq_1m_today.empty:
-                        charts_html += f"""
-                        <div style='flex: 1;'>
-                            <h3>NQ 一分鐘線圖</h3>
-                            <p>數據日期：{latest_date}</p>
-                        """
-                        fig_nq_1m = create_candlestick_chart(nq_1m_today, "NQ 一分鐘K線圖", show_bollinger=False)
-                        charts_html += fig_nq_1m.to_html(include_plotlyjs=False, div_id='nq-1m-chart', full_html=False)
-                        charts_html += "</div>"
-            
-            charts_html += "</div>"
-            
-            # 合併HTML內容
-            combined_html = html_content + charts_html
-            
-            # 使用足够大的固定高度显示完整HTML
-            components.html(combined_html, height=20000, scrolling=False)
-        else:
-            st.error("❌ 無法讀取 HTML 檔案")
+        # 整頁重跑時重新生成K線圖；切換報告只會重跑 render_html_viewer
+        st.session_state["charts"] = None
+        render_html_viewer(html_files)
     else:
         st.error("❌ data 目錄中找不到 HTML 檔案")
 